@@ -1,6 +1,7 @@
 from modelos import Enlace
-from typing import List, Tuple, Dict, Set
-from collections import deque
+from grafos import construir_csr, k_caminos_lote, enlaces_bidireccionales
+from typing import List, Tuple, Dict, Set, Optional
+from itertools import islice, product
 import random
 
 
@@ -32,7 +33,7 @@ def numerar_nodos_fat_tree(k: int) -> Dict[str, range]:
     }
 
 
-def generar_fat_tree(k: int, capacity: float = 100.0) -> Tuple[List[Enlace], Dict]:
+def generar_fat_tree(k: int, capacity: float = 100.0) -> Tuple[Tuple[Enlace, ...], Dict]:
     """
     Genera una topología fat tree k-ary.
 
@@ -44,13 +45,12 @@ def generar_fat_tree(k: int, capacity: float = 100.0) -> Tuple[List[Enlace], Dic
     - Total: (k²/4) core switches
 
     Returns:
-        Tuple de (lista de Enlaces, diccionario con info de nodos)
+        Tuple de (tupla inmutable de Enlaces, diccionario con info de nodos)
     """
     if k % 2 != 0:
         raise ValueError("k debe ser par para fat tree")
 
     nodos = numerar_nodos_fat_tree(k)
-    enlaces = []
 
     # Índices para acceder a los diferentes tipos de switches
     hosts = list(nodos['hosts'])
@@ -62,47 +62,41 @@ def generar_fat_tree(k: int, capacity: float = 100.0) -> Tuple[List[Enlace], Dic
     switches_per_pod = k // 2
     hosts_per_edge = k // 2
 
+    # Primero se calculan los pares (u, v) de cada enlace bidireccional y al final se
+    # materializan todos los Enlaces de una vez
+    pares = []
+
     # Generar enlaces para cada pod
     for pod in range(num_pods):
-        # Edge switches para este pod
-        edge_start_idx = pod * switches_per_pod
-        edge_end_idx = edge_start_idx + switches_per_pod
-        pod_edge_switches = edge_switches[edge_start_idx:edge_end_idx]
-
-        # Aggregation switches para este pod
-        agg_start_idx = pod * switches_per_pod
-        agg_end_idx = agg_start_idx + switches_per_pod
-        pod_agg_switches = agg_switches[agg_start_idx:agg_end_idx]
-
-        # 1. Conectar hosts a edge switches
-        for i, edge_sw in enumerate(pod_edge_switches):
-            host_start_idx = pod * switches_per_pod * hosts_per_edge + i * hosts_per_edge
-            for j in range(hosts_per_edge):
-                host = hosts[host_start_idx + j]
-                # Enlace bidireccional: host <-> edge switch
-                enlaces.append(Enlace(host, edge_sw, capacity))
-                enlaces.append(Enlace(edge_sw, host, capacity))
+        pod_edge_switches = edge_switches[pod * switches_per_pod:(pod + 1) * switches_per_pod]
+        pod_agg_switches = agg_switches[pod * switches_per_pod:(pod + 1) * switches_per_pod]
+
+        # 1. Conectar hosts a edge switches: el edge switch i del pod atiende a los
+        #    hosts [(pod*k/2 + i)*k/2, (pod*k/2 + i + 1)*k/2)
+        pares.extend(
+            (hosts[(pod * switches_per_pod + i) * hosts_per_edge + j], edge_sw)
+            for i, edge_sw in enumerate(pod_edge_switches)
+            for j in range(hosts_per_edge)
+        )
 
         # 2. Conectar edge switches a aggregation switches (dentro del pod)
-        for edge_sw in pod_edge_switches:
-            for agg_sw in pod_agg_switches:
-                # Enlace bidireccional: edge <-> aggregation
-                enlaces.append(Enlace(edge_sw, agg_sw, capacity))
-                enlaces.append(Enlace(agg_sw, edge_sw, capacity))
+        pares.extend(
+            (edge_sw, agg_sw)
+            for edge_sw in pod_edge_switches
+            for agg_sw in pod_agg_switches
+        )
 
     # 3. Conectar aggregation switches a core switches
-    # Cada aggregation switch i en posición j del pod se conecta a k/2 core switches
-    for pod in range(num_pods):
-        agg_start_idx = pod * switches_per_pod
-        for j in range(switches_per_pod):
-            agg_sw = agg_switches[agg_start_idx + j]
-            # Este agg switch se conecta a core switches en el rango [j*k/2, (j+1)*k/2)
-            core_start = j * switches_per_pod
-            core_end = core_start + switches_per_pod
-            for core_sw in core_switches[core_start:core_end]:
-                # Enlace bidireccional: aggregation <-> core
-                enlaces.append(Enlace(agg_sw, core_sw, capacity))
-                enlaces.append(Enlace(core_sw, agg_sw, capacity))
+    # El aggregation switch en posición j de su pod se conecta a los core switches
+    # en el rango [j*k/2, (j+1)*k/2)
+    pares.extend(
+        (agg_sw, core_sw)
+        for idx, agg_sw in enumerate(agg_switches)
+        for core_sw in core_switches[(idx % switches_per_pod) * switches_per_pod:
+                                     (idx % switches_per_pod + 1) * switches_per_pod]
+    )
+
+    enlaces = enlaces_bidireccionales(pares, capacity)
 
     info = {
         'k': k,
@@ -114,100 +108,230 @@ def generar_fat_tree(k: int, capacity: float = 100.0) -> Tuple[List[Enlace], Dic
         'nodos': nodos
     }
 
-    return enlaces, info
-
-
-def construir_grafo_adyacencia(enlaces: List[Enlace]) -> Dict[int, List[Tuple[int, Enlace]]]:
-    """
-    Construye un grafo de adyacencia desde la lista de enlaces.
-
-    Returns:
-        Dict donde cada nodo mapea a lista de (vecino, enlace) tuplas
-    """
-    grafo = {}
-    for enlace in enlaces:
-        if enlace.source not in grafo:
-            grafo[enlace.source] = []
-        grafo[enlace.source].append((enlace.target, enlace))
-    return grafo
+    return tuple(enlaces), info
 
 
 def encontrar_k_paths_mas_cortos(
     source: int,
     target: int,
     enlaces: List[Enlace],
-    k: int = 3
+    k: int = 3,
+    csr: Tuple[List[int], List[int], List[int]] = None,
+    k_arbol: int = None
 ) -> List[List[Enlace]]:
     """
-    Encuentra los k caminos más cortos entre source y target usando BFS modificado.
+    Encuentra los k caminos más cortos entre source y target.
 
     Algoritmo:
     1. BFS para encontrar la distancia más corta
-    2. BFS nuevamente para encontrar todos los caminos de longitud mínima
-    3. Si hay menos de k caminos de longitud mínima, buscar caminos de longitud mínima+1, etc.
+    2. k-Dijkstra podado (ver k_caminos_mas_cortos) limitado a 2 hops más que el
+       mínimo: primero los caminos de longitud mínima, luego mínima+1, etc.
+
+    Si se pasa k_arbol y enlaces es el fat tree de generar_fat_tree(k_arbol), los
+    pares host->host con al menos k caminos de longitud mínima se resuelven en forma
+    cerrada (ver _caminos_fat_tree), sin BFS ni heap, con el mismo resultado. Si los
+    enlaces calculados no forman un camino de source a target (otra topología u otro
+    orden de enlaces) se usa la búsqueda general.
+
+    Args:
+        csr: Adyacencia de construir_csr(enlaces); si no se pasa se construye aquí.
+            Conviene construirla una sola vez por topología y reutilizarla.
+        k_arbol: Parámetro k del fat tree, para usar la enumeración en forma cerrada
 
     Returns:
         Lista de caminos, donde cada camino es una lista de Enlaces
     """
-    if source == target:
-        return [[]]
-
-    grafo = construir_grafo_adyacencia(enlaces)
-
-    # BFS para encontrar distancia más corta
-    queue = deque([(source, 0)])
-    distancias = {source: 0}
-
-    while queue:
-        nodo, dist = queue.popleft()
-        if nodo == target:
-            continue
-
-        if nodo not in grafo:
-            continue
-
-        for vecino, _ in grafo[nodo]:
-            if vecino not in distancias:
-                distancias[vecino] = dist + 1
-                queue.append((vecino, dist + 1))
-
-    if target not in distancias:
-        return []  # No hay camino
+    return encontrar_k_paths_lote([(source, target)], enlaces, k, csr, k_arbol)[0]
 
-    dist_min = distancias[target]
 
-    # Encontrar todos los caminos usando DFS con límite de longitud
-    todos_caminos = []
-    max_length_to_explore = dist_min + 2  # Explorar hasta 2 hops más que el mínimo
-
-    def dfs(nodo_actual, camino_actual, longitud):
-        if longitud > max_length_to_explore:
-            return
-
-        if nodo_actual == target:
-            todos_caminos.append(camino_actual[:])
-            return
+def _caminos_fat_tree(
+    k_arbol: int,
+    source: int,
+    target: int,
+    num_paths: int
+) -> Optional[List[Tuple[int, ...]]]:
+    """
+    Caminos más cortos entre dos hosts distintos de generar_fat_tree(k_arbol), en forma cerrada.
 
-        if nodo_actual not in grafo:
-            return
+    Cada par bidireccional (u, v) de generar_fat_tree da los enlaces 2·par (u->v) y
+    2·par+1 (v->u). Cada pod ocupa (k/2)² pares host-edge seguidos de (k/2)² pares
+    edge-agg, y tras los k pods vienen los pares agg-core, k/2 por aggregation switch.
+    Los caminos salen en el mismo orden que los da k_caminos_mas_cortos: por
+    aggregation switch y, entre pods, por core switch dentro de su grupo.
 
-        for vecino, enlace in grafo[nodo_actual]:
-            # Evitar ciclos
-            if vecino in [e.source for e in camino_actual]:
-                continue
+    Returns:
+        Los num_paths primeros caminos como tuplas de índices de enlace, o None si hay
+        menos de num_paths caminos de longitud mínima y hace falta la búsqueda general
+    """
+    if num_paths <= 0:
+        return []
+
+    mitad = k_arbol // 2
+    por_pod = mitad * mitad  # Hosts por pod, y también pares host-edge y edge-agg por pod
+    pares_por_pod = 2 * por_pod
+    base_core = k_arbol * pares_por_pod
+
+    pod_s, slot_s = divmod(source, por_pod)
+    pod_t, slot_t = divmod(target, por_pod)
+    edge_s, edge_t = slot_s // mitad, slot_t // mitad
+    subida = 2 * (pod_s * pares_por_pod + slot_s)          # host source -> su edge switch
+    bajada = 2 * (pod_t * pares_por_pod + slot_t) + 1      # edge switch -> host target
+    edge_agg_s = 2 * (pod_s * pares_por_pod + por_pod + edge_s * mitad)
+    agg_edge_t = 2 * (pod_t * pares_por_pod + por_pod + edge_t * mitad) + 1
+
+    # Mismo edge switch: el único camino simple
+    if pod_s == pod_t and edge_s == edge_t:
+        return [(subida, bajada)]
+
+    # Mismo pod: un camino por aggregation switch del pod
+    if pod_s == pod_t:
+        if num_paths > mitad:
+            return None
+        return [(subida, edge_agg_s + 2 * a, agg_edge_t + 2 * a, bajada) for a in range(num_paths)]
+
+    # Entre pods: un camino por (aggregation switch, core switch de su grupo)
+    if num_paths > por_pod:
+        return None
+    return [(subida,
+             edge_agg_s + 2 * a,
+             2 * (base_core + (pod_s * mitad + a) * mitad + c),
+             2 * (base_core + (pod_t * mitad + a) * mitad + c) + 1,
+             agg_edge_t + 2 * a,
+             bajada)
+            for a, c in islice(product(range(mitad), repeat=2), num_paths)]
+
+
+def _es_camino(enlaces: List[Enlace], camino: Tuple[int, ...], source: int, target: int) -> bool:
+    """True si los enlaces de índices camino van encadenados de source a target."""
+    nodo = source
+    for idx in camino:
+        enlace = enlaces[idx]
+        if enlace.source != nodo:
+            return False
+        nodo = enlace.target
+    return nodo == target
+
+
+def encontrar_k_paths_lote(
+    pares: List[Tuple[int, int]],
+    enlaces: List[Enlace],
+    k: int = 3,
+    csr: Tuple[List[int], List[int], List[int]] = None,
+    k_arbol: int = None
+) -> List[List[List[Enlace]]]:
+    """
+    Encuentra los k caminos más cortos para todos los pares (source, target) de una vez.
 
-            camino_actual.append(enlace)
-            dfs(vecino, camino_actual, longitud + 1)
-            camino_actual.pop()
+    La adyacencia se construye una sola vez y la búsqueda del lote es la de
+    k_caminos_lote, con los pares host->host resueltos en forma cerrada si se pasa k_arbol.
 
-    dfs(source, [], 0)
+    Returns:
+        Lista paralela a pares con los caminos de cada par (lista vacía si no hay camino)
+    """
+    if csr is None:
+        csr = construir_csr(enlaces)
+
+    via_rapida = None
+    # Sin k_arbol, o si enlaces no tiene el tamaño del fat tree, ningún par se resuelve
+    # en forma cerrada
+    if k_arbol is not None and len(enlaces) == 3 * k_arbol ** 3 // 2:
+        num_hosts = k_arbol ** 3 // 4
+
+        def via_rapida(source, target):
+            if source >= num_hosts or target >= num_hosts:
+                return None
+            caminos = _caminos_fat_tree(k_arbol, source, target, k)
+            # Los índices suponen el orden de enlaces de generar_fat_tree; si los
+            # enlaces calculados no encadenan source -> target, búsqueda general
+            if caminos is not None and all(_es_camino(enlaces, camino, source, target)
+                                           for camino in caminos):
+                return caminos
+            return None
+
+    # Explorar hasta 2 hops más que el mínimo
+    caminos_por_par = k_caminos_lote(pares, csr, k, lambda dist_min: dist_min + 2, via_rapida)
+    return [[[enlaces[idx] for idx in camino] for camino in caminos] for caminos in caminos_por_par]
+
+
+def _indice_enlace(csr: Tuple[List[int], List[int], List[int]], u: int, v: int) -> int:
+    """Índice en la lista de enlaces del enlace u->v, buscándolo entre los vecinos de u."""
+    nbr_offsets, nbr_target, nbr_enlace = csr
+    for pos in range(nbr_offsets[u], nbr_offsets[u + 1]):
+        if nbr_target[pos] == v:
+            return nbr_enlace[pos]
+    raise ValueError(f"No existe el enlace {u}->{v}")
+
+
+def encontrar_k_paths_por_firma(
+    pares: List[Tuple[int, int]],
+    enlaces: List[Enlace],
+    k_arbol: int,
+    num_paths: int = 3,
+    csr: Tuple[List[int], List[int], List[int]] = None
+) -> List[List[List[Enlace]]]:
+    """
+    k caminos más cortos de pares host->host en un fat tree, una búsqueda por firma.
 
-    # Ordenar por longitud y tomar los primeros k
-    todos_caminos.sort(key=len)
-    return todos_caminos[:k]
+    Un host sólo tiene el enlace a su edge switch, así que dos pares cuyos hosts
+    cuelgan de los mismos edge switches (misma firma: pod y posición del edge switch
+    de source y de target) tienen los mismos caminos salvo el primer y el último
+    enlace. Se busca una sola vez por firma, sobre el primer par que la tiene, y para
+    el resto de pares se sustituyen esos dos enlaces por los de sus hosts.
 
+    Args:
+        k_arbol: Parámetro k del fat tree generado con generar_fat_tree
+        num_paths: Número de caminos por par
 
-def generar_pares_aleatorios(num_hosts: int, num_flows: int, seed: int = None) -> List[Tuple[int, int]]:
+    Returns:
+        Lista paralela a pares con los caminos de cada par, igual que encontrar_k_paths_lote
+    """
+    if csr is None:
+        csr = construir_csr(enlaces)
+    hosts_per_edge = k_arbol // 2
+    hosts_per_pod = hosts_per_edge ** 2
+    num_hosts = (k_arbol ** 3) // 4
+
+    # Firma de cada par; los pares que no son host->host distintos son su propia firma
+    firmas = []
+    representantes = {}
+    for source, target in pares:
+        if source != target and source < num_hosts and target < num_hosts:
+            firma = (source // hosts_per_pod, target // hosts_per_pod,
+                     (source % hosts_per_pod) // hosts_per_edge,
+                     (target % hosts_per_pod) // hosts_per_edge)
+        else:
+            firma = (source, target)
+        firmas.append(firma)
+        representantes.setdefault(firma, (source, target))
+
+    # Una búsqueda por firma distinta
+    caminos_por_firma = dict(zip(
+        representantes,
+        encontrar_k_paths_lote(list(representantes.values()), enlaces, num_paths, csr, k_arbol)
+    ))
+
+    resultados = []
+    for (source, target), firma in zip(pares, firmas):
+        caminos = caminos_por_firma[firma]
+        if representantes[firma] != (source, target):
+            # Mismo camino entre edge switches, con el enlace de subida de source y
+            # el de bajada a target
+            edge_source = csr[1][csr[0][source]]  # Único vecino del host: su edge switch
+            edge_target = csr[1][csr[0][target]]
+            subida = enlaces[_indice_enlace(csr, source, edge_source)]
+            bajada = enlaces[_indice_enlace(csr, edge_target, target)]
+            caminos = [[subida] + camino[1:-1] + [bajada] for camino in caminos]
+        resultados.append(caminos)
+
+    return resultados
+
+
+def generar_pares_aleatorios(
+    num_hosts: int,
+    num_flows: int,
+    seed: int = None,
+    rng: random.Random = None
+) -> List[Tuple[int, int]]:
     """
     Genera pares aleatorios (source, target) de hosts para los flujos.
 
@@ -215,25 +339,27 @@ def generar_pares_aleatorios(num_hosts: int, num_flows: int, seed: int = None) -
         num_hosts: Número total de hosts (deben estar numerados 0 a num_hosts-1)
         num_flows: Número de pares a generar
         seed: Semilla para reproducibilidad
+        rng: Generador random.Random a usar (p. ej. compartido entre generadores); si
+            no se pasa se crea uno con seed, o se usa el global de random si seed es None
 
     Returns:
         Lista de tuplas (source, target)
     """
-    if seed is not None:
-        random.seed(seed)
-
-    pares = []
-    intentos = 0
-    max_intentos = num_flows * 100
+    # Generador local: con seed no se toca el estado global del módulo random
+    if rng is None:
+        rng = random.Random(seed) if seed is not None else random
 
-    while len(pares) < num_flows and intentos < max_intentos:
-        source = random.randint(0, num_hosts - 1)
-        target = random.randint(0, num_hosts - 1)
+    # Cada par ordenado (source, target) con source != target se codifica como un
+    # entero en [0, num_hosts * (num_hosts - 1)); rng.sample da códigos distintos
+    # sin reintentos ni búsquedas en la lista de pares ya generados.
+    num_pares_posibles = num_hosts * (num_hosts - 1)
+    codigos = rng.sample(range(num_pares_posibles), min(num_flows, num_pares_posibles))
 
-        if source != target and (source, target) not in pares:
-            pares.append((source, target))
-
-        intentos += 1
+    pares = []
+    for codigo in codigos:
+        source, resto = divmod(codigo, num_hosts - 1)
+        target = resto + (resto >= source)  # Saltar source
+        pares.append((source, target))
 
     if len(pares) < num_flows:
         print(f"Advertencia: Solo se pudieron generar {len(pares)} pares únicos de {num_flows} solicitados")
@@ -1,71 +1,138 @@
-from modelos import Enlace, Commodity
-from collections import defaultdict
-
-def distribuir_trafico_uniforme(commodity):
-    num_paths = len(commodity.paths)
-    if num_paths == 0:
-        raise ValueError(f"{commodity.name} no tiene paths definidos.")
-
-    trafico_unitario = commodity.requirement / num_paths
-    for path in commodity.paths:
-        path.trafico = trafico_unitario
-
-def f_prima(capacity, total_flow):
-    p = 0.99
-    if total_flow > p * capacity:
-        return 1 / (capacity * (1 - p) ** 2)
-    else:
-        return capacity / (capacity - total_flow) ** 2
-
-def calcular_flujo_por_enlace(commodities):
-    flujo_por_enlace = defaultdict(float)
-    for commodity in commodities:
+from collections import deque
+
+P_SATURACION = 0.99  # Fracción de la capacidad a partir de la cual un enlace se considera saturado
+
+def construir_soa(commodities):
+    """
+    Aplana commodities -> paths -> enlaces en listas paralelas (SoA).
+
+    Cada Enlace se numera una sola vez y los paths se guardan en formato CSR:
+    los índices de enlace del path p son path_enlaces[path_offsets[p]:path_offsets[p+1]]
+    y los paths del commodity c son los de commodity_offsets[c]:commodity_offsets[c+1].
+    enlace_path es paralelo a path_enlaces y guarda el path al que pertenece cada entrada;
+    enlaces_de_path tiene el mismo contenido como una tupla por path.
+    path_enlaces_ordenados guarda los índices de enlace de cada path ordenados y sin
+    repetir, para calcular diferencias simétricas por mezcla. origen, destino y capacidad
+    son columnas paralelas a enlaces; umbral, coste_saturado y doble_capacidad son
+    constantes por enlace de f' y f'' (ver calcular_costes).
+    """
+    indice_enlace = {}
+    enlaces = []
+    origen = []
+    destino = []
+    capacidad = []
+    path_offsets = [0]
+    path_enlaces = []
+    enlace_path = []
+    path_commodity = []
+    commodity_offsets = [0]
+    requirement = []
+
+    for c, commodity in enumerate(commodities):
         for path in commodity.paths:
             for enlace in path.enlaces:
-                flujo_por_enlace[enlace] += path.trafico
-    return dict(flujo_por_enlace)
-
-def calcular_coste_por_enlace(flujo_por_enlace):
-    costes = {}
-    for enlace, flujo in flujo_por_enlace.items():
-        costes[enlace] = f_prima(enlace.capacity, flujo)
-    return costes
-
-def calcular_coste_total_por_path(commodities, flujo_por_enlace):
-    costes_path = {}
-    for commodity in commodities:
-        #print(f"\nCostes por path para {commodity.name}:")
-        for i, path in enumerate(commodity.paths, start=1):
-            enlaces_path = [(e.source, e.target) for e in path.enlaces]
-            #print(f"\nPath {i}: Enlaces = {enlaces_path}")
-            
-            coste_path = 0.0
-            for enlace in path.enlaces:
-                flujo = flujo_por_enlace[enlace]
-                coste_enlace = f_prima(enlace.capacity, flujo)
-                #print(f" - Enlace ({enlace.source}->{enlace.target}): capacidad={enlace.capacity}, flujo={flujo:.4f}, coste={coste_enlace:.4f}")
-                coste_path += coste_enlace
-
-            #print(f" → Coste total del Path {i} = {coste_path:.4f}")
-            costes_path[(commodity, i)] = coste_path
-    return costes_path
-
-
-
-def seleccionar_path_minimo_coste(commodities, costes_path_anterior):
-    shortest_paths = {} 
-    for commodity in commodities:
-        paths_costes = {
-            path_id: coste
-            for (commodity_iter, path_id), coste in costes_path_anterior.items()
-            if commodity_iter == commodity
-        }
-        
-        if paths_costes:
-            path_minimo_id = min(paths_costes, key=paths_costes.get)
-            shortest_paths[commodity] = path_minimo_id
-    
-    return shortest_paths
+                idx = indice_enlace.get(enlace.id)
+                if idx is None:
+                    idx = len(enlaces)
+                    indice_enlace[enlace.id] = idx
+                    enlaces.append(enlace)
+                    origen.append(enlace.source)
+                    destino.append(enlace.target)
+                    capacidad.append(enlace.capacity)
+                path_enlaces.append(idx)
+                enlace_path.append(len(path_commodity))
+            path_offsets.append(len(path_enlaces))
+            path_commodity.append(c)
+        commodity_offsets.append(len(path_commodity))
+        requirement.append(commodity.requirement)
+
+    return {
+        'commodities': commodities,
+        'enlaces': enlaces,
+        'origen': origen,
+        'destino': destino,
+        'capacidad': capacidad,
+        # Constantes por enlace de f'/f'' (calcular_costes), calculadas una sola vez
+        'umbral': [P_SATURACION * cap for cap in capacidad],
+        'coste_saturado': [1 / (cap * (1 - P_SATURACION) ** 2) for cap in capacidad],
+        'doble_capacidad': [2 * cap for cap in capacidad],
+        'path_offsets': path_offsets,
+        'path_enlaces': path_enlaces,
+        'enlaces_de_path': [tuple(path_enlaces[ini:fin])
+                            for ini, fin in zip(path_offsets, path_offsets[1:])],
+        'path_enlaces_ordenados': [tuple(sorted(set(path_enlaces[ini:fin])))
+                                   for ini, fin in zip(path_offsets, path_offsets[1:])],
+        'enlace_path': enlace_path,
+        'path_commodity': path_commodity,
+        'commodity_offsets': commodity_offsets,
+        'requirement': requirement
+    }
+
+def distribuir_trafico_uniforme(soa):
+    path_trafico = []
+    offsets = soa['commodity_offsets']
+    for c, requirement in enumerate(soa['requirement']):
+        num_paths = offsets[c + 1] - offsets[c]
+        if num_paths == 0:
+            raise ValueError(f"{soa['commodities'][c].name} no tiene paths definidos.")
+
+        trafico_unitario = requirement / num_paths
+        path_trafico.extend([trafico_unitario] * num_paths)
+    return path_trafico
+
+def calcular_flujo_por_enlace(soa, path_trafico):
+    # Producto de la traspuesta de la incidencia path -> enlace (filas enlaces_de_path,
+    # construidas una sola vez en construir_soa) por el tráfico: el tráfico de cada
+    # path se lee una vez y se suma en todos sus enlaces
+    flujo_por_enlace = [0.0] * len(soa['enlaces'])
+    for enlaces, trafico in zip(soa['enlaces_de_path'], path_trafico):
+        for idx in enlaces:
+            flujo_por_enlace[idx] += trafico
+    return flujo_por_enlace
+
+def calcular_costes(soa, flujo_por_enlace):
+    """
+    Evalúa en una sola pasada sobre los enlaces la derivada primera y segunda del coste,
+    y con la primera el coste de cada path. Con p = P_SATURACION:
+
+        f'(x)  = C / (C - x)^2          si x <= p·C, y 1 / (C·(1 - p)^2) si no
+        f''(x) = 2·C / (C - x)^3        si x <= p·C, y 0 si no
+
+    Returns:
+        Tuple de (f_dp_por_enlace, costes_path)
+    """
+    coste_por_enlace = []
+    f_dp_por_enlace = []
+    for capacidad, umbral, saturado, doble_capacidad, flujo in zip(
+            soa['capacidad'], soa['umbral'], soa['coste_saturado'], soa['doble_capacidad'],
+            flujo_por_enlace):
+        # f' y f'' con las constantes precalculadas del enlace
+        if flujo > umbral:
+            coste_por_enlace.append(saturado)
+            f_dp_por_enlace.append(0.0)
+        else:
+            holgura = capacidad - flujo
+            coste_por_enlace.append(capacidad / holgura ** 2)
+            f_dp_por_enlace.append(doble_capacidad / holgura ** 3)
+    return f_dp_por_enlace, calcular_coste_total_por_path(soa, coste_por_enlace)
+
+def calcular_trafico_por_commodity(soa, path_trafico):
+    """Tráfico total asignado a cada commodity: suma de su rango de path_trafico."""
+    offsets = soa['commodity_offsets']
+    return [sum(path_trafico[ini:fin]) for ini, fin in zip(offsets, offsets[1:])]
+
+def calcular_coste_total_por_path(soa, coste_por_enlace):
+    coste = coste_por_enlace.__getitem__
+    return [sum(map(coste, enlaces)) for enlaces in soa['enlaces_de_path']]
+
+
+
+def seleccionar_path_minimo_coste(soa, costes_path):
+    """Devuelve, para cada commodity, el índice global del path de menor coste."""
+    # min() sobre el tramo del commodity y list.index() acotado al mismo tramo: ambos en C,
+    # sin llamar a una función key por path. Con empates gana el primer path, como antes.
+    return [costes_path.index(min(costes_path[ini:fin]), ini, fin)
+            for ini, fin in zip(soa['commodity_offsets'], soa['commodity_offsets'][1:])]
 
 def calculo_del_trafico_para_la_siguiente_iteracion(
     t: int,
@@ -79,119 +146,250 @@ def calculo_del_trafico_para_la_siguiente_iteracion(
     nuevo_trafico = termino_positivo
     return nuevo_trafico
 
-def f_double_prima(enlace: Enlace, flujo_total: float) -> float:
-    p = 0.99
-    if flujo_total > p * enlace.capacity:
-        return 0.0
-    else:
-        return (2 * enlace.capacity) / (enlace.capacity - flujo_total) ** 3
-
-def calcular_H_kp(path_actual, mejor_path, flujo_por_enlace_anterior):
-    enlaces_actual = set(path_actual.enlaces)
-    enlaces_mejor = set(mejor_path.enlaces)
-    L_kp = enlaces_actual.symmetric_difference(enlaces_mejor)
-    
-    #print("\n--- Debug H_kp ---")
-    #print(f"Enlaces Path actual: [{', '.join(f'({e.source}->{e.target})' for e in enlaces_actual)}]")
-    #print(f"Enlaces Mejor path: [{', '.join(f'({e.source}->{e.target})' for e in enlaces_mejor)}]")
-    #print(f"Diferencia simétrica (L_kp): [{', '.join(f'({e.source}->{e.target})' for e in L_kp)}]")
-    
+def calcular_H_kp(soa, path_actual, mejor_path, f_dp_por_enlace_anterior):
+    enlaces_actual = soa['path_enlaces_ordenados'][path_actual]
+    enlaces_mejor = soa['path_enlaces_ordenados'][mejor_path]
+    f_dp = f_dp_por_enlace_anterior
+
+    # Suma de f'' sobre la diferencia simétrica (L_kp), mezclando las dos listas
+    # ordenadas de índices de enlace
     H_kp = 0.0
-    for enlace in L_kp:
-        flujo = flujo_por_enlace_anterior.get(enlace, 0.0)
-        f_dp = f_double_prima(enlace, flujo)
-        #print(f"Enlace ({enlace.source}->{enlace.target}): capacidad={enlace.capacity}, flujo={flujo:.4f}, f''={f_dp:.6f}")
-        H_kp += f_dp
-    
-    #print(f"H_kp final: {H_kp:.6f}\n")
+    i = j = 0
+    n_actual, n_mejor = len(enlaces_actual), len(enlaces_mejor)
+    while i < n_actual and j < n_mejor:
+        a, b = enlaces_actual[i], enlaces_mejor[j]
+        if a == b:
+            i += 1
+            j += 1
+        elif a < b:
+            H_kp += f_dp[a]
+            i += 1
+        else:
+            H_kp += f_dp[b]
+            j += 1
+    for idx in enlaces_actual[i:]:
+        H_kp += f_dp[idx]
+    for idx in enlaces_mejor[j:]:
+        H_kp += f_dp[idx]
     return H_kp
 
 
-def funcion_principal(commodities):
+def actualizar_trafico_commodity(soa, c, path_trafico, f_dp_anterior, costes_anterior, beta, t, traza=None):
+    """
+    Paso de proyección de gradiente para el commodity c, cuyo path de menor coste es beta.
+
+    Sólo lee el estado de la iteración anterior (f_dp_anterior, costes_anterior) y sólo
+    escribe en su propio tramo path_trafico[commodity_offsets[c]:commodity_offsets[c+1]],
+    así que los commodities son independientes entre sí dentro de una iteración.
+    """
+    ini, fin = soa['commodity_offsets'][c], soa['commodity_offsets'][c + 1]
+    requirement = soa['requirement'][c]
+    d_kbeta = costes_anterior[beta]
+
+    suma_flujo_otros = 0.0
+    for p in range(ini, fin):
+        if p == beta:
+            continue
+        x_kp_actual = path_trafico[p]
+        H_kp = calcular_H_kp(soa, p, beta, f_dp_anterior)
+        d_kp = costes_anterior[p]
+        nuevo_trafico = calculo_del_trafico_para_la_siguiente_iteracion(
+            t=t,
+            x_kp_actual=x_kp_actual,
+            H_kp=H_kp,
+            d_kp=d_kp,
+            d_kbeta=d_kbeta
+        )
+        if traza is not None:
+            traza.append(('path', c, p, x_kp_actual, H_kp, d_kp, d_kbeta, nuevo_trafico))
+        path_trafico[p] = nuevo_trafico
+        suma_flujo_otros += nuevo_trafico
+
+    flujo_shortest_path = requirement - suma_flujo_otros
+    path_trafico[beta] = max(0.0, flujo_shortest_path)
+    if traza is not None:
+        traza.append(('shortest', c, beta, requirement, suma_flujo_otros, flujo_shortest_path))
+
+
+def actualizar_trafico(soa, path_trafico, f_dp_anterior, costes_anterior, shortest_paths, t, traza=None):
+    """
+    Aplica en sitio sobre path_trafico el paso de proyección de gradiente de una iteración.
+
+    Sólo trabaja sobre las listas del SoA y sobre el estado de la iteración anterior.
+    Si se pasa una lista en traza, se añaden las tuplas
+    ('path', c, p, x_kp, H_kp, d_kp, d_kbeta, nuevo_trafico) y
+    ('shortest', c, beta, requirement, suma_flujo_otros, flujo_shortest_path)
+    para poder mostrarlas después.
+    """
+    for c, beta in enumerate(shortest_paths):
+        actualizar_trafico_commodity(soa, c, path_trafico, f_dp_anterior, costes_anterior, beta, t, traza)
+
+
+def resolver_lp(soa):
+    """
+    Reparto de tráfico que minimiza la utilización máxima de los enlaces, como un único LP.
+
+    Variables: el tráfico f_p de cada path global y alfa. Se minimiza alfa sujeto a
+    sum(f_p de c) = requirement_c para cada commodity, sum(f_p de paths que usan e) <= alfa·c_e
+    para cada enlace y f_p >= 0. Las matrices se construyen dispersas directamente desde
+    path_enlaces/enlace_path del SoA.
+
+    scipy (linprog con HiGHS) se importa aquí: es opcional y el resto del módulo sólo
+    depende de la librería estándar.
+
+    Returns:
+        Tuple de (path_trafico, alfa)
+    """
+    try:
+        from scipy.optimize import linprog
+        from scipy.sparse import csc_matrix
+    except ImportError as e:
+        raise ImportError("backend='lp' necesita scipy (pip install scipy)") from e
+
+    num_paths = len(soa['path_commodity'])
+    num_enlaces = len(soa['enlaces'])
+    col_alfa = num_paths
+
+    # Capacidad: flujo del enlace e - alfa·c_e <= 0
+    filas = soa['path_enlaces'] + list(range(num_enlaces))
+    columnas = soa['enlace_path'] + [col_alfa] * num_enlaces
+    datos = [1.0] * len(soa['path_enlaces']) + [-cap for cap in soa['capacidad']]
+    A_ub = csc_matrix((datos, (filas, columnas)), shape=(num_enlaces, num_paths + 1))
+
+    # Demanda: tráfico total de los paths de cada commodity igual a su requirement
+    A_eq = csc_matrix(([1.0] * num_paths, (soa['path_commodity'], list(range(num_paths)))),
+                      shape=(len(soa['requirement']), num_paths + 1))
+
+    resultado = linprog(c=[0.0] * num_paths + [1.0],
+                        A_ub=A_ub, b_ub=[0.0] * num_enlaces,
+                        A_eq=A_eq, b_eq=soa['requirement'],
+                        bounds=(0, None), method='highs')
+    if not resultado.success:
+        raise ValueError(f"El LP no tiene solución: {resultado.message}")
+
+    return [float(f) for f in resultado.x[:num_paths]], float(resultado.x[col_alfa])
+
+def _imprimir_traza(soa, traza, t):
+    commodities = soa['commodities']
+    commodity_offsets = soa['commodity_offsets']
+    for registro in traza:
+        commodity = commodities[registro[1]]
+        ini = commodity_offsets[registro[1]]
+        if registro[0] == 'path':
+            _, _, p, x_kp_actual, H_kp, d_kp, d_kbeta, nuevo_trafico = registro
+            print(f"\nActualizando {commodity.name} Path {p - ini + 1}:")
+            print(f"• t: {t}")
+            print(f"• x_kp_actual: {x_kp_actual:.4f}")
+            print(f"• H_kp: {H_kp:.4f}")
+            print(f"• d_kp: {d_kp:.4f}")
+            print(f"• d_kbeta: {d_kbeta:.4f}")
+            print(f"-> Nuevo tráfico: {nuevo_trafico:.4f}")
+        else:
+            _, _, beta, requirement, suma_flujo_otros, flujo_shortest_path = registro
+            print(f"\n{commodity.name} - Path {beta - ini + 1} (shortest) actualizado:")
+            print(f"Flujo total requirement: {requirement:.4f}")
+            print(f"Suma otros paths: {suma_flujo_otros:.4f}")
+            print(f"Flujo asignado: {flujo_shortest_path:.4f}")
+
+
+def _imprimir_estado(soa, flujo_total, costes_path, shortest_paths):
+    commodities = soa['commodities']
+    commodity_offsets = soa['commodity_offsets']
+
+    print("\nCantidad de flujo que pasa por cada enlace:")
+    for enlace, flujo in zip(soa['enlaces'], flujo_total):
+        print(f"{enlace}: Flujo = {flujo:.4f}")
+
+    print("\nCoste total de cada path en función del commodity:")
+    for c, commodity in enumerate(commodities):
+        ini, fin = commodity_offsets[c], commodity_offsets[c + 1]
+        for p in range(ini, fin):
+            print(f"{commodity.name}, Path {p - ini + 1}: Coste = {costes_path[p]:.4f}")
+
+    print("\nPath de menor coste para cada commodity:")
+    for c, commodity in enumerate(commodities):
+        beta = shortest_paths[c]
+        print(f"{commodity.name}: Path {beta - commodity_offsets[c] + 1} con coste {costes_path[beta]:.4f}")
+
+
+def funcion_principal(commodities, verbose=False, num_iteraciones=200, backend='gradiente',
+                      historial=None):
+    """
+    Ejecuta las iteraciones de la optimización sobre los commodities.
+
+    La estructura de paths y enlaces (SoA) se construye una sola vez antes del bucle;
+    dentro de él sólo cambian el tráfico por path y los flujos/costes derivados.
+    Con verbose=True se imprime el detalle de cada iteración; por defecto no se
+    formatea ni se escribe nada, y el histórico queda en el diccionario devuelto.
+
+    Con backend='lp' no se itera: el reparto sale de resolver_lp (requiere scipy) y el
+    histórico tiene una sola entrada, más la utilización máxima en "utilizacion_maxima".
+
+    historial=M guarda sólo las M últimas iteraciones de flujo_total, costes_path y
+    shortest_paths (deque de longitud máxima M) en lugar de todas; el número de
+    iteraciones ejecutadas queda en "num_iteraciones".
+    """
+    if backend not in ('gradiente', 'lp'):
+        raise ValueError(f"backend desconocido: {backend}")
+    if num_iteraciones < 1:
+        raise ValueError(f"num_iteraciones debe ser al menos 1: {num_iteraciones}")
+    if historial is not None and historial < 1:
+        raise ValueError(f"historial debe ser None o al menos 1: {historial}")
+
+    soa = construir_soa(commodities)
+    nuevo_historico = list if historial is None else (lambda: deque(maxlen=historial))
     iteraciones = {
-        "flujo_total": [],
-        "costes_path": [],
-        "shortest_paths": []
+        "flujo_total": nuevo_historico(),
+        "costes_path": nuevo_historico(),
+        "shortest_paths": nuevo_historico(),
+        "soa": soa
     }
 
-    for i in range(200):    # Número de iteraciones
-        print(f"\n{'='*40}\nIteración {i}:\n{'='*40}")
+    commodity_offsets = soa['commodity_offsets']
+    if backend == 'lp':
+        num_iteraciones = 1  # El LP da directamente el reparto final
+
+    for i in range(num_iteraciones):
+        if verbose:
+            print(f"\n{'='*40}\nIteración {i}:\n{'='*40}")
 
         if i == 0:
-            for commodity in commodities:
-                distribuir_trafico_uniforme(commodity)
-            print("\nVerificación de tráfico inicial:")
-            for commodity in commodities:
-                traficos = [f"{path.trafico:.4f}" for path in commodity.paths]
-                print(f"{commodity.name}: {traficos}")
+            if backend == 'lp':
+                path_trafico, iteraciones["utilizacion_maxima"] = resolver_lp(soa)
+            else:
+                path_trafico = distribuir_trafico_uniforme(soa)
+            if verbose:
+                print("\nVerificación de tráfico inicial:")
+                for c, commodity in enumerate(commodities):
+                    ini, fin = commodity_offsets[c], commodity_offsets[c + 1]
+                    traficos = [f"{trafico:.4f}" for trafico in path_trafico[ini:fin]]
+                    print(f"{commodity.name}: {traficos}")
         else:
-            for commodity in commodities:
-                costes_commodity = {path_id: coste 
-                                   for (comm, path_id), coste in iteraciones["costes_path"][i-1].items() 
-                                   if comm == commodity}
-                if not costes_commodity:
-                    continue
-                path_minimo_id = min(costes_commodity, key=costes_commodity.get)
-                d_kbeta = costes_commodity[path_minimo_id]
-
-                suma_flujo_otros = 0.0
-                for path_id, coste_actual in costes_commodity.items():
-                    if path_id == path_minimo_id:
-                        continue
-                    path_actual = commodity.paths[path_id - 1]
-                    x_kp_actual = path_actual.trafico
-                    t = i
-                    mejor_path = commodity.paths[path_minimo_id - 1]
-                    H_kp = calcular_H_kp(
-                        path_actual=path_actual,
-                        mejor_path=mejor_path,
-                        flujo_por_enlace_anterior=iteraciones["flujo_total"][i-1]
-                    )
-                    d_kp = coste_actual
-                    
-                    print(f"\nActualizando {commodity.name} Path {path_id}:")
-                    print(f"• t: {t}")
-                    print(f"• x_kp_actual: {x_kp_actual:.4f}")
-                    print(f"• H_kp: {H_kp:.4f}")
-                    print(f"• d_kp: {d_kp:.4f}")
-                    print(f"• d_kbeta: {d_kbeta:.4f}")
-
-                    nuevo_trafico = calculo_del_trafico_para_la_siguiente_iteracion(
-                        t=i, 
-                        x_kp_actual=x_kp_actual, 
-                        H_kp=H_kp, 
-                        d_kp=d_kp, 
-                        d_kbeta=d_kbeta
-                    )
-                    print(f"-> Nuevo tráfico: {nuevo_trafico:.4f}")
-                    commodity.paths[path_id-1].trafico = nuevo_trafico
-                    suma_flujo_otros += nuevo_trafico
-
-                flujo_shortest_path = commodity.requirement - suma_flujo_otros
-                commodity.paths[path_minimo_id-1].trafico = max(0.0, flujo_shortest_path)
-                print(f"\n{commodity.name} - Path {path_minimo_id} (shortest) actualizado:")
-                print(f"Flujo total requirement: {commodity.requirement:.4f}")
-                print(f"Suma otros paths: {suma_flujo_otros:.4f}")
-                print(f"Flujo asignado: {flujo_shortest_path:.4f}")
-
-        flujo_total = calcular_flujo_por_enlace(commodities)
-        costes_path = calcular_coste_total_por_path(commodities, flujo_total)
-        shortest_paths = seleccionar_path_minimo_coste(commodities, costes_path)
+            traza = [] if verbose else None
+            actualizar_trafico(soa, path_trafico, f_dp_por_enlace, costes_path, shortest_paths, i, traza)
+            if verbose:
+                _imprimir_traza(soa, traza, i)
+
+        flujo_total = calcular_flujo_por_enlace(soa, path_trafico)
+        f_dp_por_enlace, costes_path = calcular_costes(soa, flujo_total)
+        shortest_paths = seleccionar_path_minimo_coste(soa, costes_path)
 
+        # El flujo se guarda como lista indexada por enlace (paralela a soa['enlaces']) y
+        # los costes y shortest paths como listas planas indexadas por path global;
+        # iteraciones["soa"]["commodity_offsets"] da el rango de cada commodity
         iteraciones["flujo_total"].append(flujo_total)
         iteraciones["costes_path"].append(costes_path)
         iteraciones["shortest_paths"].append(shortest_paths)
 
-        print("\nCantidad de flujo que pasa por cada enlace:")
-        for enlace, flujo in flujo_total.items():
-            print(f"{enlace}: Flujo = {flujo:.4f}")
+        if verbose:
+            _imprimir_estado(soa, flujo_total, costes_path, shortest_paths)
+
+    # Tráfico final por path global, paralelo a soa['path_offsets'][:-1]
+    iteraciones["path_trafico"] = path_trafico
+    iteraciones["num_iteraciones"] = num_iteraciones
 
-        print("\nCoste total de cada path en función del commodity:")
-        for (commodity, i), coste in costes_path.items():
-            print(f"{commodity.name}, Path {i}: Coste = {coste:.4f}")
-            
-        print("\nPath de menor coste para cada commodity:")
-        for commodity, path_id in shortest_paths.items():
-            print(f"{commodity.name}: Path {path_id} con coste {costes_path[(commodity, path_id)]:.4f}")
+    # Volcar el tráfico final en los objetos Path
+    for commodity_path, trafico in zip((path for c in commodities for path in c.paths), path_trafico):
+        commodity_path.trafico = trafico
 
-    return iteraciones
\ No newline at end of file
+    return iteraciones
@@ -0,0 +1,207 @@
+from modelos import Enlace
+from typing import Callable, List, Optional, Tuple, Dict
+from heapq import heappush, heappop
+
+
+def enlaces_bidireccionales(pares: List[Tuple[int, int]], capacity: float) -> List[Enlace]:
+    """Crea los Enlaces u->v y v->u de cada par (u, v), en ese orden."""
+    return [Enlace(a, b, capacity) for u, v in pares for a, b in ((u, v), (v, u))]
+
+
+def construir_csr(enlaces: List[Enlace]) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Construye la adyacencia en formato CSR a partir de la lista de enlaces.
+
+    Los vecinos del nodo v son nbr_target[nbr_offsets[v]:nbr_offsets[v+1]] y
+    nbr_enlace guarda, en paralelo, el índice del enlace en la lista enlaces.
+    El orden de los vecinos de cada nodo es el mismo que en la lista de enlaces.
+
+    Returns:
+        Tuple de (nbr_offsets, nbr_target, nbr_enlace)
+    """
+    num_nodos = 1 + max((max(e.source, e.target) for e in enlaces), default=-1)
+
+    nbr_offsets = [0] * (num_nodos + 1)
+    for enlace in enlaces:
+        nbr_offsets[enlace.source + 1] += 1
+    for v in range(num_nodos):
+        nbr_offsets[v + 1] += nbr_offsets[v]
+
+    siguiente = nbr_offsets[:-1]
+    nbr_target = [0] * len(enlaces)
+    nbr_enlace = [0] * len(enlaces)
+    for i, enlace in enumerate(enlaces):
+        pos = siguiente[enlace.source]
+        nbr_target[pos] = enlace.target
+        nbr_enlace[pos] = i
+        siguiente[enlace.source] = pos + 1
+
+    return nbr_offsets, nbr_target, nbr_enlace
+
+
+def bfs_distancias(nbr_offsets: List[int], nbr_target: List[int], origen: int) -> List[int]:
+    """
+    BFS sobre la adyacencia CSR desde origen.
+
+    Returns:
+        Lista con la distancia en hops a cada nodo (-1 si no es alcanzable)
+    """
+    distancias = [-1] * (len(nbr_offsets) - 1)
+    distancias[origen] = 0
+    cola = [origen]  # Cola sobre una lista plana, avanzando un índice de cabeza
+    cabeza = 0
+
+    while cabeza < len(cola):
+        nodo = cola[cabeza]
+        cabeza += 1
+        dist = distancias[nodo] + 1
+        for vecino in nbr_target[nbr_offsets[nodo]:nbr_offsets[nodo + 1]]:
+            if distancias[vecino] < 0:
+                distancias[vecino] = dist
+                cola.append(vecino)
+
+    return distancias
+
+
+def k_caminos_mas_cortos(
+    nbr_offsets: List[int],
+    nbr_target: List[int],
+    nbr_enlace: List[int],
+    source: int,
+    target: int,
+    k: int,
+    max_len: int,
+    marcas: Dict = None
+) -> List[Tuple[int, ...]]:
+    """
+    k caminos simples más cortos (en hops) de source a target, de como mucho max_len hops.
+
+    k-Dijkstra podado: los caminos parciales salen de un heap ordenado por longitud
+    (empates en orden de inserción) y cuenta[v] lleva cuántos caminos extraídos
+    terminaban en v. Un nodo sólo se expande mientras cuenta[v] <= k y la búsqueda
+    para en cuanto hay k caminos hasta target, así que el trabajo queda acotado por
+    O(k·(E + V log V)) aunque existan muchos más caminos de la misma longitud.
+
+    Los caminos parciales no se copian: cada uno es una entrada de los buffers planos
+    buf_nodo/buf_enlace/buf_padre que apunta a la entrada de la que se extendió, y el
+    heap sólo guarda (longitud, entrada). La tupla de enlaces se reconstruye únicamente
+    para los caminos que llegan a target.
+
+    marcas ({'cuenta': [0] * num_nodos, 'base': 0}) permite reutilizar el buffer de cuenta
+    entre búsquedas sin volver a ponerlo a cero: cada búsqueda cuenta a partir de su
+    propia base, mayor que cualquier valor escrito por las anteriores, y un valor por
+    debajo de la base equivale a 0.
+
+    Returns:
+        Lista de caminos en orden de longitud, cada uno como tupla de índices de enlace
+    """
+    if marcas is None:
+        marcas = {'cuenta': [0] * (len(nbr_offsets) - 1), 'base': 0}
+    cuenta = marcas['cuenta']
+    base = marcas['base']
+    lleno = base + k  # cuenta[v] == lleno: v ya se ha extraído k veces en esta búsqueda
+    marcas['base'] = lleno + 1
+
+    buf_nodo = [source]
+    buf_enlace = [-1]
+    buf_padre = [-1]
+    heap = [(0, 0)]  # El índice de entrada crece con cada push: desempata por inserción
+    caminos = []
+
+    while heap and len(caminos) < k:
+        longitud, entrada = heappop(heap)
+        nodo = buf_nodo[entrada]
+        c = cuenta[nodo]
+        if c >= lleno:
+            continue
+        cuenta[nodo] = (c if c > base else base) + 1
+
+        if nodo == target:
+            camino = []
+            while entrada:
+                camino.append(buf_enlace[entrada])
+                entrada = buf_padre[entrada]
+            caminos.append(tuple(reversed(camino)))
+            continue
+
+        if longitud == max_len:
+            continue
+
+        # Nodos del camino parcial, para evitar ciclos
+        en_camino = set()
+        e = entrada
+        while e >= 0:
+            en_camino.add(buf_nodo[e])
+            e = buf_padre[e]
+
+        for pos in range(nbr_offsets[nodo], nbr_offsets[nodo + 1]):
+            vecino = nbr_target[pos]
+            # Evitar ciclos y nodos que ya no se van a expandir
+            if vecino in en_camino or cuenta[vecino] >= lleno:
+                continue
+            heappush(heap, (longitud + 1, len(buf_nodo)))
+            buf_nodo.append(vecino)
+            buf_enlace.append(nbr_enlace[pos])
+            buf_padre.append(entrada)
+
+    return caminos
+
+
+def k_caminos_lote(
+    pares: List[Tuple[int, int]],
+    csr: Tuple[List[int], List[int], List[int]],
+    k: int,
+    limite: Callable[[int], int],
+    via_rapida: Callable[[int, int], Optional[List[Tuple[int, ...]]]] = None
+) -> List[List[Tuple[int, ...]]]:
+    """
+    k caminos más cortos para todos los pares (source, target) de una vez.
+
+    Mismo resultado que buscar par a par, pero el BFS de distancias se hace una vez por
+    source distinto y el buffer de cuenta de k_caminos_mas_cortos se reutiliza en todo
+    el lote.
+
+    Args:
+        limite: Longitud máxima a explorar (en hops) en función de la distancia mínima
+            del par
+        via_rapida: Si se pasa, via_rapida(source, target) puede dar directamente los
+            caminos de un par con source != target, o None para usar la búsqueda general
+
+    Returns:
+        Lista paralela a pares con los caminos de cada par como tuplas de índices de
+        enlace ([()] si source == target, lista vacía si no hay camino)
+    """
+    nbr_offsets, nbr_target, nbr_enlace = csr
+    num_nodos = len(nbr_offsets) - 1
+
+    distancias_desde = {}  # source -> distancias BFS, compartidas entre sus pares
+    marcas = {'cuenta': [0] * num_nodos, 'base': 0}  # Buffer de cuenta común a todo el lote
+    resultados = []
+    for source, target in pares:
+        if source == target:
+            resultados.append([()])
+            continue
+        if source >= num_nodos or target >= num_nodos:
+            resultados.append([])
+            continue
+
+        if via_rapida is not None:
+            caminos = via_rapida(source, target)
+            if caminos is not None:
+                resultados.append(caminos)
+                continue
+
+        # BFS para encontrar la distancia más corta
+        distancias = distancias_desde.get(source)
+        if distancias is None:
+            distancias = distancias_desde[source] = bfs_distancias(nbr_offsets, nbr_target, source)
+        dist_min = distancias[target]
+        if dist_min < 0:
+            resultados.append([])  # No hay camino
+            continue
+
+        # k-Dijkstra podado hasta el límite de longitud del par
+        resultados.append(k_caminos_mas_cortos(nbr_offsets, nbr_target, nbr_enlace, source, target,
+                                               k, limite(dist_min), marcas))
+
+    return resultados
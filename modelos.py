@@ -1,26 +1,26 @@
+from dataclasses import dataclass, field
+from itertools import count
 from typing import List
 
 
+_ids_enlace = count()  # IDs enteros únicos, usados como índice en los arrays de enlaces
+
+
+@dataclass(frozen=True, slots=True)
 class Enlace:
-    def __init__(self, source: int, target: int, capacity: float):
-        self.source = source
-        self.target = target
-        self.capacity = capacity
+    # Igualdad y hash sólo por id: cada Enlace construido es un enlace distinto
+    source: int = field(compare=False)
+    target: int = field(compare=False)
+    capacity: float = field(compare=False)
+    id: int = field(default_factory=lambda: next(_ids_enlace))
 
     def __repr__(self):
         return f"Enlace con inicio en {self.source}, final en {self.target}, capacidad = {self.capacity}"
 
-    def __eq__(self, other):
-        return isinstance(other, Enlace) and \
-            self.source == other.source and \
-            self.target == other.target and \
-            self.capacity == other.capacity
-
-    def __hash__(self):
-        return hash((self.source, self.target, self.capacity))
-
 
 class Path:
+    __slots__ = ('id', 'commodity', 'enlaces', 'trafico')
+
     contador = 1  # para asignar IDs únicos si quieres diferenciarlos
 
     def __init__(self, commodity, enlaces: List['Enlace'], trafico: float = 0.0):
@@ -47,12 +47,18 @@ class Path:
 
 
 class Commodity:
+    __slots__ = ('source', 'target', 'requirement', 'paths')
+
     def __init__(self, source: int, target: int, requirement: float):
         self.source = source
         self.target = target
         self.requirement = requirement
         self.paths: List['Path'] = []  # se rellenará después
-        self.name = f"Commodity de {source} -> {target}"
+
+    @property
+    def name(self):
+        # Se construye al consultarlo (sólo para mensajes) en lugar de guardarse
+        return f"Commodity de {self.source} -> {self.target}"
 
     def __repr__(self):
         return f"Commodity({self.source} → {self.target}, req: {self.requirement})"
@@ -1,6 +1,7 @@
 from modelos import Enlace
+from grafos import construir_csr, k_caminos_lote, enlaces_bidireccionales
 from typing import List, Tuple, Dict, Set
-from collections import deque
+from itertools import combinations
 import random
 
 
@@ -24,20 +25,13 @@ def generar_anillo_simple(
     Returns:
         Lista de Enlaces que forman el anillo
     """
-    enlaces = []
-
-    for i in range(num_nodes):
-        source = node_offset + i
-        target = node_offset + ((i + 1) % num_nodes)
-
-        # Enlace en dirección clockwise
-        enlaces.append(Enlace(source, target, capacity))
+    # Enlaces en dirección clockwise
+    pares = [(node_offset + i, node_offset + (i + 1) % num_nodes) for i in range(num_nodes)]
 
-        # Enlace en dirección counter-clockwise (si bidireccional)
-        if bidirectional:
-            enlaces.append(Enlace(target, source, capacity))
-
-    return enlaces
+    # Enlaces en dirección counter-clockwise (si bidireccional)
+    if bidirectional:
+        return enlaces_bidireccionales(pares, capacity)
+    return [Enlace(source, target, capacity) for source, target in pares]
 
 
 def generar_red_acceso_agregacion(
@@ -48,7 +42,7 @@ def generar_red_acceso_agregacion(
     uplink_capacity: float,
     agg_capacity: float,
     connections_per_ring: int = 2
-) -> Tuple[List[Enlace], Dict]:
+) -> Tuple[Tuple[Enlace, ...], Dict]:
     """
     Genera una red de acceso jerárquica con anillos de acceso y capa de agregación.
 
@@ -62,7 +56,7 @@ def generar_red_acceso_agregacion(
         connections_per_ring: Cuántos nodos de agregación conecta cada anillo
 
     Returns:
-        Tuple de (lista de Enlaces, diccionario con info de la red)
+        Tuple de (tupla inmutable de Enlaces, diccionario con info de la red)
     """
     enlaces = []
 
@@ -96,27 +90,24 @@ def generar_red_acceso_agregacion(
         gateway_node_2 = ring_id * nodes_per_ring + (nodes_per_ring // 2)  # Punto medio
 
         # Gateway 1: conectar a connections_per_ring nodos de agregación
-        gw1_agg_nodes = []
-        for i in range(connections_per_ring):
-            agg_idx = (ring_id * connections_per_ring * 2 + i) % num_agg_nodes
-            agg_node = agg_nodes[agg_idx]
-            gw1_agg_nodes.append(agg_node)
-
-            # Enlace bidireccional: gateway 1 <-> aggregation
-            enlaces.append(Enlace(gateway_node_1, agg_node, uplink_capacity))
-            enlaces.append(Enlace(agg_node, gateway_node_1, uplink_capacity))
+        gw1_agg_nodes = [
+            agg_nodes[(ring_id * connections_per_ring * 2 + i) % num_agg_nodes]
+            for i in range(connections_per_ring)
+        ]
 
         # Gateway 2: conectar a connections_per_ring nodos DIFERENTES de agregación
-        gw2_agg_nodes = []
-        for i in range(connections_per_ring):
-            # Offset para asegurar que sean diferentes nodos de agregación
-            agg_idx = (ring_id * connections_per_ring * 2 + connections_per_ring + i) % num_agg_nodes
-            agg_node = agg_nodes[agg_idx]
-            gw2_agg_nodes.append(agg_node)
-
-            # Enlace bidireccional: gateway 2 <-> aggregation
-            enlaces.append(Enlace(gateway_node_2, agg_node, uplink_capacity))
-            enlaces.append(Enlace(agg_node, gateway_node_2, uplink_capacity))
+        # (offset para asegurar que sean diferentes nodos de agregación)
+        gw2_agg_nodes = [
+            agg_nodes[(ring_id * connections_per_ring * 2 + connections_per_ring + i) % num_agg_nodes]
+            for i in range(connections_per_ring)
+        ]
+
+        # Enlaces bidireccionales: gateway <-> aggregation, añadidos por lotes
+        enlaces.extend(enlaces_bidireccionales(
+            [(gateway_node_1, agg_node) for agg_node in gw1_agg_nodes]
+            + [(gateway_node_2, agg_node) for agg_node in gw2_agg_nodes],
+            uplink_capacity
+        ))
 
         gateway_info.append({
             'ring_id': ring_id,
@@ -128,10 +119,7 @@ def generar_red_acceso_agregacion(
 
     # 3. Crear capa de agregación (full mesh o anillo)
     # Opción: full mesh entre nodos de agregación
-    for i, agg_node_i in enumerate(agg_nodes):
-        for agg_node_j in agg_nodes[i+1:]:
-            enlaces.append(Enlace(agg_node_i, agg_node_j, agg_capacity))
-            enlaces.append(Enlace(agg_node_j, agg_node_i, agg_capacity))
+    enlaces.extend(enlaces_bidireccionales(list(combinations(agg_nodes, 2)), agg_capacity))
 
     info = {
         'num_access_rings': num_access_rings,
@@ -148,19 +136,7 @@ def generar_red_acceso_agregacion(
         'connections_per_gateway': connections_per_ring
     }
 
-    return enlaces, info
-
-
-def construir_grafo_adyacencia(enlaces: List[Enlace]) -> Dict[int, List[Tuple[int, Enlace]]]:
-    """
-    Construye un grafo de adyacencia desde la lista de enlaces.
-    """
-    grafo = {}
-    for enlace in enlaces:
-        if enlace.source not in grafo:
-            grafo[enlace.source] = []
-        grafo[enlace.source].append((enlace.target, enlace))
-    return grafo
+    return tuple(enlaces), info
 
 
 def encontrar_k_paths_bfs(
@@ -168,10 +144,11 @@ def encontrar_k_paths_bfs(
     target: int,
     enlaces: List[Enlace],
     k: int = 3,
-    max_length: int = None
+    max_length: int = None,
+    csr: Tuple[List[int], List[int], List[int]] = None
 ) -> List[List[Enlace]]:
     """
-    Encuentra hasta k caminos más cortos entre source y target usando BFS.
+    Encuentra hasta k caminos más cortos entre source y target (BFS + k-Dijkstra podado).
 
     Args:
         source: Nodo origen
@@ -179,71 +156,39 @@ def encontrar_k_paths_bfs(
         enlaces: Lista de todos los enlaces
         k: Número máximo de caminos a encontrar
         max_length: Longitud máxima de caminos (en hops)
+        csr: Adyacencia de construir_csr(enlaces); si no se pasa se construye aquí
 
     Returns:
         Lista de caminos, donde cada camino es una lista de Enlaces
     """
-    if source == target:
-        return [[]]
-
-    grafo = construir_grafo_adyacencia(enlaces)
-
-    # BFS para encontrar la distancia más corta
-    queue = deque([(source, 0)])
-    distancias = {source: 0}
-
-    while queue:
-        nodo, dist = queue.popleft()
-        if nodo == target:
-            continue
-
-        if nodo not in grafo:
-            continue
-
-        for vecino, _ in grafo[nodo]:
-            if vecino not in distancias:
-                distancias[vecino] = dist + 1
-                queue.append((vecino, dist + 1))
-
-    if target not in distancias:
-        return []
-
-    dist_min = distancias[target]
-
-    # Establecer límite de búsqueda
-    if max_length is None:
-        max_length = dist_min + 3
-
-    # DFS para encontrar todos los caminos
-    todos_caminos = []
+    return encontrar_k_paths_bfs_lote([(source, target)], enlaces, k, max_length, csr)[0]
 
-    def dfs(nodo_actual, camino_actual, visitados):
-        if len(camino_actual) > max_length:
-            return
 
-        if nodo_actual == target:
-            todos_caminos.append(camino_actual[:])
-            if len(todos_caminos) >= k * 3:  # Encontrar extra para filtrar después
-                return
-            return
-
-        if nodo_actual not in grafo:
-            return
+def encontrar_k_paths_bfs_lote(
+    pares: List[Tuple[int, int]],
+    enlaces: List[Enlace],
+    k: int = 3,
+    max_length: int = None,
+    csr: Tuple[List[int], List[int], List[int]] = None
+) -> List[List[List[Enlace]]]:
+    """
+    Encuentra hasta k caminos más cortos para todos los pares (source, target) de una vez.
 
-        for vecino, enlace in grafo[nodo_actual]:
-            if vecino not in visitados:
-                visitados.add(vecino)
-                camino_actual.append(enlace)
-                dfs(vecino, camino_actual, visitados)
-                camino_actual.pop()
-                visitados.remove(vecino)
+    Mismo resultado que llamar a encontrar_k_paths_bfs par a par; la adyacencia se
+    construye una sola vez y la búsqueda del lote es la de k_caminos_lote.
 
-    visitados = {source}
-    dfs(source, [], visitados)
+    Returns:
+        Lista paralela a pares con los caminos de cada par (lista vacía si no hay camino)
+    """
+    if csr is None:
+        csr = construir_csr(enlaces)
 
-    # Ordenar por longitud y tomar los k más cortos
-    todos_caminos.sort(key=len)
-    return todos_caminos[:k]
+    # Límite de búsqueda: max_length, o 3 hops más que el mínimo de cada par
+    caminos_por_par = k_caminos_lote(
+        pares, csr, k,
+        (lambda dist_min: dist_min + 3) if max_length is None else (lambda dist_min: max_length)
+    )
+    return [[[enlaces[idx] for idx in camino] for camino in caminos] for caminos in caminos_por_par]
 
 
 def generar_commodities_estrategicos(
@@ -251,7 +196,8 @@ def generar_commodities_estrategicos(
     info: Dict,
     requirement: float,
     intra_ring_ratio: float = 0.5,
-    seed: int = None
+    seed: int = None,
+    rng: random.Random = None
 ) -> List[Tuple[int, int]]:
     """
     Genera pares (source, target) estratégicos para commodities.
@@ -262,12 +208,15 @@ def generar_commodities_estrategicos(
         requirement: Requirement de cada commodity
         intra_ring_ratio: Proporción de commodities intra-ring vs inter-ring (0 a 1)
         seed: Semilla para reproducibilidad
+        rng: Generador random.Random a usar (p. ej. compartido entre generadores); si
+            no se pasa se crea uno con seed, o se usa el global de random si seed es None
 
     Returns:
         Lista de tuplas (source, target)
     """
-    if seed is not None:
-        random.seed(seed)
+    # Generador local: con seed no se toca el estado global del módulo random
+    if rng is None:
+        rng = random.Random(seed) if seed is not None else random
 
     access_nodes = info['access_nodes']
     nodes_per_ring = info['nodes_per_ring']
@@ -275,50 +224,31 @@ def generar_commodities_estrategicos(
 
     pares = []
     num_intra_ring = int(num_commodities * intra_ring_ratio)
-    num_inter_ring = num_commodities - num_intra_ring
 
-    # 1. Generar commodities intra-ring (dentro del mismo anillo)
-    intentos = 0
-    max_intentos = num_intra_ring * 100
+    # Los pares se codifican como enteros distintos y se muestrean con rng.sample,
+    # sin bucles de rechazo ni búsquedas en la lista de pares ya generados.
 
-    while len(pares) < num_intra_ring and intentos < max_intentos:
-        ring_id = random.randint(0, num_access_rings - 1)
+    # 1. Generar commodities intra-ring (dentro del mismo anillo)
+    pares_por_anillo = nodes_per_ring * (nodes_per_ring - 1)
+    num_intra_posibles = num_access_rings * pares_por_anillo
+    for codigo in rng.sample(range(num_intra_posibles), min(num_intra_ring, num_intra_posibles)):
+        ring_id, resto = divmod(codigo, pares_por_anillo)
+        source_idx, target_idx = divmod(resto, nodes_per_ring - 1)
+        target_idx += target_idx >= source_idx  # Saltar source
         ring_start = ring_id * nodes_per_ring
-        ring_end = ring_start + nodes_per_ring
-
-        source = random.randint(ring_start, ring_end - 1)
-        target = random.randint(ring_start, ring_end - 1)
-
-        if source != target and (source, target) not in pares:
-            pares.append((source, target))
-
-        intentos += 1
-
-    # 2. Generar commodities inter-ring (entre diferentes anillos)
-    intentos = 0
-    max_intentos = num_inter_ring * 100
-
-    while len(pares) < num_commodities and intentos < max_intentos:
-        ring_id_1 = random.randint(0, num_access_rings - 1)
-        ring_id_2 = random.randint(0, num_access_rings - 1)
-
-        # Asegurar que sean anillos diferentes
-        if ring_id_1 == ring_id_2:
-            intentos += 1
-            continue
-
-        ring_start_1 = ring_id_1 * nodes_per_ring
-        ring_end_1 = ring_start_1 + nodes_per_ring
-
-        ring_start_2 = ring_id_2 * nodes_per_ring
-        ring_end_2 = ring_start_2 + nodes_per_ring
-
-        source = random.randint(ring_start_1, ring_end_1 - 1)
-        target = random.randint(ring_start_2, ring_end_2 - 1)
-
-        if (source, target) not in pares:
-            pares.append((source, target))
-
-        intentos += 1
+        pares.append((ring_start + source_idx, ring_start + target_idx))
+
+    # 2. Generar commodities inter-ring (entre diferentes anillos) hasta completar
+    #    num_commodities, también si no hubo bastantes pares intra-ring
+    num_inter_ring = max(0, num_commodities - len(pares))
+    pares_por_par_de_anillos = nodes_per_ring * nodes_per_ring
+    num_inter_posibles = num_access_rings * (num_access_rings - 1) * pares_por_par_de_anillos
+    for codigo in rng.sample(range(num_inter_posibles), min(num_inter_ring, num_inter_posibles)):
+        par_de_anillos, resto = divmod(codigo, pares_por_par_de_anillos)
+        ring_id_1, ring_id_2 = divmod(par_de_anillos, num_access_rings - 1)
+        ring_id_2 += ring_id_2 >= ring_id_1  # Asegurar que sean anillos diferentes
+        source_idx, target_idx = divmod(resto, nodes_per_ring)
+        pares.append((ring_id_1 * nodes_per_ring + source_idx,
+                      ring_id_2 * nodes_per_ring + target_idx))
 
     return pares
@@ -22,4 +22,4 @@ k2.add_path(Path(k2, [e1, e2]))
 k2.add_path(Path(k2, [e1, e3, e5]))
 
 # Ejecutar simulación
-funcion_principal([k1, k2])
+funcion_principal([k1, k2], verbose=True)
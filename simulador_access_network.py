@@ -1,13 +1,31 @@
 from modelos import Commodity, Path
-from funciones import funcion_principal
+from funciones import funcion_principal, calcular_trafico_por_commodity
 from ring_topology import (
     generar_red_acceso_agregacion,
-    encontrar_k_paths_bfs,
+    construir_csr,
+    encontrar_k_paths_bfs_lote,
     generar_commodities_estrategicos
 )
+import heapq
 import time
 
 
+def _imprimir_capa(titulo, linea_enlaces, capa):
+    """
+    Imprime el resumen de utilización de una capa (acumuladores de main).
+
+    Returns:
+        False si la capa no tiene enlaces considerados y sólo se imprimió el título
+    """
+    print(f"\n--- {titulo} ---")
+    if not capa['considerados']:
+        return False
+    print(linea_enlaces)
+    print(f"Utilización promedio: {capa['suma'] / capa['considerados'] * 100:.1f}%")
+    print(f"Utilización máxima: {capa['maximo']*100:.1f}%")
+    return True
+
+
 def main():
     print("="*70)
     print("SIMULADOR DE RED DE ACCESO CON ANILLOS")
@@ -113,15 +131,14 @@ def main():
     commodities = []
     start_time = time.time()
 
-    for idx, (source, target) in enumerate(pares_commodities):
+    # Adyacencia construida una sola vez y hasta 3 paths de todos los pares en lote
+    csr = construir_csr(enlaces)
+    paths_por_par = encontrar_k_paths_bfs_lote(pares_commodities, enlaces, k=3, max_length=10, csr=csr)
+
+    for idx, ((source, target), paths_enlaces) in enumerate(zip(pares_commodities, paths_por_par)):
         # Crear commodity
         commodity = Commodity(source, target, requirement_per_commodity)
 
-        # Encontrar hasta 3 paths
-        paths_enlaces = encontrar_k_paths_bfs(
-            source, target, enlaces, k=3, max_length=10
-        )
-
         if not paths_enlaces:
             print(f"  ⚠ Advertencia: No se encontraron paths para commodity {source}→{target}")
             continue
@@ -152,14 +169,15 @@ def main():
     print(f"{'='*70}\n")
 
     start_time = time.time()
-    resultados = funcion_principal(commodities)
+    # El análisis sólo usa la última iteración: no hace falta guardar el resto
+    resultados = funcion_principal(commodities, historial=1)
     simulation_time = time.time() - start_time
 
     print(f"\n{'='*70}")
     print("SIMULACIÓN COMPLETADA")
     print(f"{'='*70}")
     print(f"Tiempo total: {simulation_time:.2f}s")
-    print(f"Iteraciones ejecutadas: {len(resultados['flujo_total'])}")
+    print(f"Iteraciones ejecutadas: {resultados['num_iteraciones']}")
 
     # Análisis final
     print(f"\n{'='*70}")
@@ -167,82 +185,86 @@ def main():
     print(f"{'='*70}")
 
     if resultados['flujo_total']:
-        ultima_iteracion = resultados['flujo_total'][-1]
-
-        # Separar enlaces por tipo
-        enlaces_acceso = []
-        enlaces_uplink = []
-        enlaces_agg = []
-
-        for enlace, flujo in ultima_iteracion.items():
+        # Flujo de la última iteración, indexado como las columnas SoA de los enlaces usados
+        flujo = resultados['flujo_total'][-1]
+        soa = resultados['soa']
+        origen, destino, capacidad = soa['origen'], soa['destino'], soa['capacidad']
+        total_access_nodes = info['total_access_nodes']
+
+        # Utilización de cada enlace, calculada una sola vez y reutilizada por todas las capas
+        utilizacion = [f / cap for f, cap in zip(flujo, capacidad)]
+
+        # Una sola pasada: por capa, sus enlaces (índices en las columnas SoA) y los
+        # acumuladores de utilización. En agregación sólo se consideran los enlaces
+        # activos (flujo > 0).
+        capas = {
+            nombre: {'enlaces': [], 'considerados': 0, 'suma': 0.0,
+                     'maximo': float('-inf'), 'minimo': float('inf')}
+            for nombre in ('acceso', 'uplink', 'agregacion')
+        }
+
+        for i, (source, target) in enumerate(zip(origen, destino)):
             # Enlaces de acceso: ambos nodos < total_access_nodes
-            if enlace.source < info['total_access_nodes'] and enlace.target < info['total_access_nodes']:
-                enlaces_acceso.append((enlace, flujo))
+            if source < total_access_nodes and target < total_access_nodes:
+                capa = capas['acceso']
             # Enlaces de agregación: ambos nodos >= total_access_nodes
-            elif enlace.source >= info['total_access_nodes'] and enlace.target >= info['total_access_nodes']:
-                enlaces_agg.append((enlace, flujo))
+            elif source >= total_access_nodes and target >= total_access_nodes:
+                capa = capas['agregacion']
             # Enlaces uplink: cruzan entre capas
             else:
-                enlaces_uplink.append((enlace, flujo))
+                capa = capas['uplink']
+            capa['enlaces'].append(i)
 
-        # Análisis por capa
-        print("\n--- CAPA DE ACCESO (Bottleneck) ---")
-        if enlaces_acceso:
-            enlaces_acceso_sorted = sorted(enlaces_acceso, key=lambda x: x[1]/x[0].capacity, reverse=True)
-            utilizaciones_acceso = [flujo/enlace.capacity for enlace, flujo in enlaces_acceso]
-            avg_util = sum(utilizaciones_acceso) / len(utilizaciones_acceso)
+            if capa is capas['agregacion'] and flujo[i] <= 0:
+                continue
 
-            print(f"Enlaces de acceso: {len(enlaces_acceso)}")
-            print(f"Utilización promedio: {avg_util*100:.1f}%")
-            print(f"Utilización máxima: {max(utilizaciones_acceso)*100:.1f}%")
-            print(f"Utilización mínima: {min(utilizaciones_acceso)*100:.1f}%")
+            util = utilizacion[i]
+            capa['considerados'] += 1
+            capa['suma'] += util
+            capa['maximo'] = max(capa['maximo'], util)
+            capa['minimo'] = min(capa['minimo'], util)
+
+        acceso, uplink, agregacion = capas['acceso'], capas['uplink'], capas['agregacion']
+        enlaces_uplink = uplink['enlaces']
+
+        # Análisis por capa
+        if _imprimir_capa("CAPA DE ACCESO (Bottleneck)",
+                          f"Enlaces de acceso: {len(acceso['enlaces'])}", acceso):
+            print(f"Utilización mínima: {acceso['minimo']*100:.1f}%")
 
             print(f"\nTop 10 enlaces de acceso con mayor utilización:")
-            for i, (enlace, flujo) in enumerate(enlaces_acceso_sorted[:10], 1):
-                util = (flujo / enlace.capacity) * 100
-                print(f"  {i}. Enlace {enlace.source}→{enlace.target}: "
-                      f"{flujo:.2f}/{enlace.capacity:.2f} ({util:.1f}%)")
-
-        print("\n--- ENLACES UPLINK ---")
-        if enlaces_uplink:
-            enlaces_uplink_sorted = sorted(enlaces_uplink, key=lambda x: x[1]/x[0].capacity, reverse=True)
-            utilizaciones_uplink = [flujo/enlace.capacity for enlace, flujo in enlaces_uplink]
-            avg_util = sum(utilizaciones_uplink) / len(utilizaciones_uplink)
-
-            print(f"Enlaces uplink: {len(enlaces_uplink)}")
-            print(f"Utilización promedio: {avg_util*100:.1f}%")
-            print(f"Utilización máxima: {max(utilizaciones_uplink)*100:.1f}%")
-
-        print("\n--- CAPA DE AGREGACIÓN ---")
-        if enlaces_agg:
-            utilizaciones_agg = [flujo/enlace.capacity for enlace, flujo in enlaces_agg if flujo > 0]
-            if utilizaciones_agg:
-                avg_util = sum(utilizaciones_agg) / len(utilizaciones_agg)
-                print(f"Enlaces de agregación activos: {len(utilizaciones_agg)}/{len(enlaces_agg)}")
-                print(f"Utilización promedio: {avg_util*100:.1f}%")
-                print(f"Utilización máxima: {max(utilizaciones_agg)*100:.1f}%")
+            top_enlaces_acceso = heapq.nlargest(10, acceso['enlaces'], key=utilizacion.__getitem__)
+            for n, i in enumerate(top_enlaces_acceso, 1):
+                print(f"  {n}. Enlace {origen[i]}→{destino[i]}: "
+                      f"{flujo[i]:.2f}/{capacidad[i]:.2f} ({utilizacion[i] * 100:.1f}%)")
+
+        _imprimir_capa("ENLACES UPLINK", f"Enlaces uplink: {len(uplink['enlaces'])}", uplink)
+
+        _imprimir_capa("CAPA DE AGREGACIÓN",
+                       f"Enlaces de agregación activos: "
+                       f"{agregacion['considerados']}/{len(agregacion['enlaces'])}",
+                       agregacion)
 
         # Análisis de Gateways (Dual-Gateway)
         print("\n--- ANÁLISIS DE GATEWAYS (Dual-Gateway) ---")
         if 'gateway_info' in info:
             gateway_stats = []
 
+            # Flujo saliente hacia agregación por nodo de acceso, en una sola pasada
+            # sobre los enlaces uplink; cada gateway se consulta luego por su nodo
+            flujo_uplink_por_nodo = [0.0] * total_access_nodes
+            for i in enlaces_uplink:
+                if origen[i] < total_access_nodes:
+                    flujo_uplink_por_nodo[origen[i]] += flujo[i]
+
             for gw_info in info['gateway_info']:
                 ring_id = gw_info['ring_id']
                 gw1_node = gw_info['gateway_1']
                 gw2_node = gw_info['gateway_2']
 
-                # Calcular flujo a través de cada gateway
-                gw1_flujo = 0.0
-                gw2_flujo = 0.0
-
-                for enlace, flujo in ultima_iteracion.items():
-                    # Gateway 1: enlaces salientes desde gw1_node
-                    if enlace.source == gw1_node and enlace.target >= info['total_access_nodes']:
-                        gw1_flujo += flujo
-                    # Gateway 2: enlaces salientes desde gw2_node
-                    if enlace.source == gw2_node and enlace.target >= info['total_access_nodes']:
-                        gw2_flujo += flujo
+                # Flujo a través de cada gateway: enlaces salientes desde su nodo
+                gw1_flujo = flujo_uplink_por_nodo[gw1_node]
+                gw2_flujo = flujo_uplink_por_nodo[gw2_node]
 
                 # Capacidad total de cada gateway
                 gw_capacity = info['connections_per_gateway'] * uplink_capacity
@@ -284,9 +306,9 @@ def main():
             print(f"Anillos con carga balanceada (ratio 0.8-1.25): {balanced_rings}/{len(gateway_stats)}")
 
             # Mostrar top 5 anillos con mayor desbalance
-            gateway_stats_sorted = sorted(gateway_stats, key=lambda x: abs(x['balance_ratio'] - 1.0), reverse=True)
+            top_desbalance = heapq.nlargest(5, gateway_stats, key=lambda x: abs(x['balance_ratio'] - 1.0))
             print(f"\nTop 5 anillos con mayor desbalance de carga:")
-            for i, gs in enumerate(gateway_stats_sorted[:5], 1):
+            for i, gs in enumerate(top_desbalance, 1):
                 print(f"  {i}. Ring {gs['ring_id']}:")
                 print(f"     GW1 (nodo {info['gateway_info'][gs['ring_id']]['gateway_1']}): "
                       f"{gs['gw1_flujo']:.2f}/{gs['gw_capacity']:.2f} ({gs['gw1_util']*100:.1f}%)")
@@ -299,9 +321,10 @@ def main():
         all_satisfied = True
         violations = []
 
-        for commodity in commodities:
-            total_trafico = sum(path.trafico for path in commodity.paths)
-            diff = abs(total_trafico - commodity.requirement)
+        # Totales por commodity de una pasada sobre el tráfico plano por path
+        totales = calcular_trafico_por_commodity(soa, resultados['path_trafico'])
+        for commodity, total_trafico, requirement in zip(commodities, totales, soa['requirement']):
+            diff = abs(total_trafico - requirement)
             if diff >= 0.01:
                 all_satisfied = False
                 violations.append((commodity, total_trafico, diff))
@@ -1,10 +1,12 @@
 from modelos import Commodity, Path
-from funciones import funcion_principal
+from funciones import funcion_principal, calcular_trafico_por_commodity
 from fat_tree_topology import (
     generar_fat_tree,
-    encontrar_k_paths_mas_cortos,
+    construir_csr,
+    encontrar_k_paths_por_firma,
     generar_pares_aleatorios
 )
+import heapq
 import time
 
 
@@ -52,15 +54,15 @@ def main():
     commodities = []
     start_time = time.time()
 
-    for idx, (source, target) in enumerate(pares_flujos):
+    # Adyacencia construida una sola vez; k paths más cortos de todos los pares en lote,
+    # con una sola búsqueda por pareja de edge switches (firma)
+    csr = construir_csr(enlaces)
+    paths_por_par = encontrar_k_paths_por_firma(pares_flujos, enlaces, k, num_paths_per_flow, csr=csr)
+
+    for idx, ((source, target), paths_enlaces) in enumerate(zip(pares_flujos, paths_por_par)):
         # Crear commodity
         commodity = Commodity(source, target, flow_requirement)
 
-        # Encontrar k paths más cortos
-        paths_enlaces = encontrar_k_paths_mas_cortos(
-            source, target, enlaces, num_paths_per_flow
-        )
-
         if not paths_enlaces:
             print(f"  ⚠ Advertencia: No se encontraron paths para flujo {source}→{target}")
             continue
@@ -91,14 +93,15 @@ def main():
     print(f"{'='*60}\n")
 
     start_time = time.time()
-    resultados = funcion_principal(commodities)
+    # El análisis sólo usa la última iteración: no hace falta guardar el resto
+    resultados = funcion_principal(commodities, historial=1)
     simulation_time = time.time() - start_time
 
     print(f"\n{'='*60}")
     print("SIMULACIÓN COMPLETADA")
     print(f"{'='*60}")
     print(f"Tiempo total: {simulation_time:.2f}s")
-    print(f"Iteraciones ejecutadas: {len(resultados['flujo_total'])}")
+    print(f"Iteraciones ejecutadas: {resultados['num_iteraciones']}")
 
     # Análisis final
     print(f"\n{'='*60}")
@@ -106,24 +109,24 @@ def main():
     print(f"{'='*60}")
 
     if resultados['flujo_total']:
-        ultima_iteracion = resultados['flujo_total'][-1]
+        # Flujo de la última iteración, indexado como las columnas SoA de los enlaces usados
+        flujo = resultados['flujo_total'][-1]
+        soa = resultados['soa']
+        origen, destino, capacidad = soa['origen'], soa['destino'], soa['capacidad']
+
+        # Utilización de cada enlace, calculada una sola vez
+        utilizacion = [f / cap for f, cap in zip(flujo, capacidad)]
 
         # Enlaces con mayor utilización
-        enlaces_ordenados = sorted(
-            ultima_iteracion.items(),
-            key=lambda x: x[1] / x[0].capacity,
-            reverse=True
-        )
+        top_enlaces = heapq.nlargest(10, range(len(flujo)), key=utilizacion.__getitem__)
 
         print("\nTop 10 enlaces con mayor utilización:")
-        for i, (enlace, flujo) in enumerate(enlaces_ordenados[:10], 1):
-            utilizacion = (flujo / enlace.capacity) * 100
-            print(f"  {i}. Enlace {enlace.source}→{enlace.target}: "
-                  f"{flujo:.2f}/{enlace.capacity:.2f} ({utilizacion:.1f}%)")
+        for n, i in enumerate(top_enlaces, 1):
+            print(f"  {n}. Enlace {origen[i]}→{destino[i]}: "
+                  f"{flujo[i]:.2f}/{capacidad[i]:.2f} ({utilizacion[i] * 100:.1f}%)")
 
         # Estadísticas de costes por path
-        costes_finales = resultados['costes_path'][-1]
-        valores_costes = list(costes_finales.values())
+        valores_costes = resultados['costes_path'][-1]
         if valores_costes:
             print(f"\nEstadísticas de costes de paths:")
             print(f"  - Coste mínimo: {min(valores_costes):.4f}")
@@ -133,8 +136,9 @@ def main():
         # Verificar flow conservation
         print(f"\nVerificación de conservación de flujo:")
         all_satisfied = True
-        for commodity in commodities[:5]:  # Mostrar solo los primeros 5
-            total_trafico = sum(path.trafico for path in commodity.paths)
+        # Totales por commodity de una pasada sobre el tráfico plano por path
+        totales = calcular_trafico_por_commodity(resultados['soa'], resultados['path_trafico'])
+        for commodity, total_trafico in zip(commodities[:5], totales):  # Mostrar solo los primeros 5
             diff = abs(total_trafico - commodity.requirement)
             status = "✓" if diff < 0.01 else "✗"
             print(f"  {status} {commodity.name}: "